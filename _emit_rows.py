@@ -0,0 +1,37 @@
+# Горячий цикл отчета: строки о местах и ширина колонок.
+# Вынесен в отдельный модуль с аннотациями типов, чтобы его можно было
+# скомпилировать командой `mypyc _emit_rows.py`; собранное расширение
+# импортируется вместо этого файла автоматически.
+from typing import Any, Iterator
+
+
+def update_widths(carriages: list[Any], widths: list[int], status: tuple[str, str]) -> None:
+    # Обновляет ширину колонок по данным мест. Места хранятся по колонкам,
+    # поэтому ширину можно посчитать до записи строк, не собирая их в память
+    for carriage in carriages:
+        if not carriage.reserved:
+            continue  # Вагон без мест не дает строк в отчете
+        widths[0] = max(widths[0], len(str(carriage.number)))
+        widths[1] = max(widths[1], len(str(carriage.carriage_type)))
+        widths[2] = max(widths[2], max(map(len, map(str, carriage.seat_numbers))))
+        widths[3] = max(widths[3], max(map(len, map(str, carriage.seat_types))))
+        widths[4] = max(widths[4], max(map(len, map(str, carriage.comfort_classes))))
+        if 0 in carriage.reserved:
+            widths[5] = max(widths[5], len(status[0]))
+        if 1 in carriage.reserved:
+            widths[5] = max(widths[5], len(status[1]))
+
+
+def emit_rows(carriages: list[Any], status: tuple[str, str]) -> Iterator[tuple[object, ...]]:
+    # Выдает строки отчета по всем местам поезда по одной, без общего буфера.
+    # Флаги бронирования хранятся как 0/1, поэтому статус берется индексом без ветвления
+    for carriage in carriages:
+        # Номер и тип вагона не обязаны быть int/str (например, вагон "10А"),
+        # поэтому в скомпилированном модуле они не проверяются как конкретные типы
+        carriage_number: object = carriage.number
+        carriage_type: object = carriage.carriage_type
+        for number, seat_type, comfort_class, reserved in zip(
+                carriage.seat_numbers, carriage.seat_types,
+                carriage.comfort_classes, carriage.reserved):
+            yield (carriage_number, carriage_type, number,
+                   seat_type, comfort_class, status[reserved])
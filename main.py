@@ -1,84 +1,186 @@
 import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 
+from _emit_rows import emit_rows, update_widths
+
+try:
+    import orjson  # Быстрый JSON на C, если установлен
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Потоковый разбор JSON, если установлен
+except ImportError:
+    ijson = None
+
+try:
+    import msgpack  # Двоичный формат MessagePack, если установлен
+except ImportError:
+    msgpack = None
+
+# Статусы мест и шрифт заголовков отчета (одни объекты на все ячейки)
+# Индекс в _STATUS — флаг бронирования места (0 — свободно, 1 — забронировано)
+_STATUS = (sys.intern("Свободно"), sys.intern("Забронировано"))
+_BOLD = Font(bold=True)
+
+# Колонки отчета всегда одни и те же
+_HEADERS = ('Вагон', 'Тип вагона', 'Место', 'Тип места', 'Класс', 'Статус')
+_COL_LETTERS = ('A', 'B', 'C', 'D', 'E', 'F')
+
+def _intern(value):
+    # Интернирует строку; остальные значения (например, null из JSON) возвращает как есть
+    return sys.intern(value) if type(value) is str else value
+
 # Класс Seat представляет одно место в вагоне
 class Seat:
+    __slots__ = ('number', 'seat_type', 'comfort_class', 'reserved')
+
     def __init__(self, number, seat_type, comfort_class, reserved=False):
         self.number = number           # Номер места
-        self.seat_type = seat_type     # Тип: "нижнее" или "верхнее"
-        self.comfort_class = comfort_class  # Класс: "купейное" или "плацкартное"
+        # Повторяющиеся строки интернируем, чтобы одинаковые значения были одним объектом
+        self.seat_type = _intern(seat_type)     # Тип: "нижнее" или "верхнее"
+        self.comfort_class = _intern(comfort_class)  # Класс: "купейное" или "плацкартное"
         self.reserved = reserved       # Статус бронирования
 
     def __eq__(self, other):
         # Два места считаются одинаковыми если совпадает класс комфорта и тип места
+        if not isinstance(other, Seat):
+            return NotImplemented
         return (self.comfort_class == other.comfort_class and 
                 self.seat_type == other.seat_type)
 
+    def __hash__(self):
+        # Хеш согласован с __eq__: по классу комфорта и типу места
+        return hash((self.comfort_class, self.seat_type))
+
     def to_dict(self):
         # Преобразует объект места в словарь для сохранения в JSON
-        return self.__dict__
+        return {
+            'number': self.number,
+            'seat_type': self.seat_type,
+            'comfort_class': self.comfort_class,
+            'reserved': self.reserved
+        }
 
     @classmethod
     def from_dict(cls, data):
         # Создает объект места из словаря (при загрузке из файла)
-        return cls(**data)
+        return cls(data['number'], data['seat_type'], data['comfort_class'], data.get('reserved', False))
 
 # Класс Carriage представляет железнодорожный вагон
 class Carriage:
+    __slots__ = ('number', 'carriage_type', 'seat_numbers', 'seat_types',
+                 'comfort_classes', 'reserved')
+
     def __init__(self, number, carriage_type):
         self.number = number          # Номер вагона
         self.carriage_type = carriage_type  # Тип: "купейный" или "плацкартный"
-        self.seats = []               # Список мест в вагоне
+        # Места хранятся по колонкам: i-й элемент каждого списка относится к i-му месту
+        self.seat_numbers = []        # Номера мест
+        self.seat_types = []          # Типы мест
+        self.comfort_classes = []     # Классы комфорта мест
+        self.reserved = bytearray()   # Статусы бронирования (0 или 1)
 
     def add_seat(self, seat):
         # Добавляет место в вагон
-        self.seats.append(seat)
+        self.add_seat_values(seat.number, seat.seat_type, seat.comfort_class, seat.reserved)
+
+    def add_seat_values(self, number, seat_type, comfort_class, reserved=False):
+        # Добавляет место по значениям полей сразу в колонки, без объекта Seat
+        self.seat_numbers.append(number)
+        self.seat_types.append(_intern(seat_type))
+        self.comfort_classes.append(_intern(comfort_class))
+        self.reserved.append(1 if reserved else 0)
+
+    def booked_count(self):
+        # Количество забронированных мест (подсчет идет на C по колонке статусов)
+        return self.reserved.count(1)
+
+    def reserve(self, index, flag=True):
+        # Бронирует место с порядковым номером index (flag=False снимает бронь)
+        self.reserved[index] = 1 if flag else 0
+
+    @property
+    def seats(self):
+        # Места вагона в виде объектов Seat. Это копия, собранная из колонок,
+        # поэтому изменения в ней не попадают в вагон: бронь меняется через reserve()
+        return tuple(Seat(number, seat_type, comfort_class, bool(reserved))
+                     for number, seat_type, comfort_class, reserved
+                     in zip(self.seat_numbers, self.seat_types, self.comfort_classes, self.reserved))
 
     def __eq__(self, other):
         # Два вагона равны если совпадают номера и типы
+        if not isinstance(other, Carriage):
+            return NotImplemented
         return self.number == other.number and self.carriage_type == other.carriage_type
 
+    def __hash__(self):
+        # Хеш согласован с __eq__: по номеру и типу вагона
+        return hash((self.number, self.carriage_type))
+
     def to_dict(self):
         # Преобразует вагон и все его места в словарь
         return {
             'number': self.number,
             'carriage_type': self.carriage_type,
-            'seats': [seat.to_dict() for seat in self.seats]  # Сохраняем все места
+            'seats': [  # Сохраняем все места
+                {'number': number, 'seat_type': seat_type,
+                 'comfort_class': comfort_class, 'reserved': bool(reserved)}
+                for number, seat_type, comfort_class, reserved
+                in zip(self.seat_numbers, self.seat_types, self.comfort_classes, self.reserved)
+            ]
         }
 
     @classmethod
     def from_dict(cls, data):
         # Восстанавливает вагон из словаря
         carriage = cls(data['number'], data['carriage_type'])
-        # Восстанавливаем все места вагона
-        carriage.seats = [Seat.from_dict(seat_data) for seat_data in data['seats']]
+        # Восстанавливаем все места вагона сразу в колонки, без промежуточных объектов Seat
+        for seat_data in data['seats']:
+            carriage.add_seat_values(seat_data['number'], seat_data['seat_type'],
+                                     seat_data['comfort_class'], seat_data.get('reserved', False))
         return carriage
 
 # Класс Locomotive представляет локомотив поезда
 class Locomotive:
+    __slots__ = ('serial_number', 'power')
+
     def __init__(self, serial_number, power):
         self.serial_number = serial_number  # Серийный номер
         self.power = power                  # Мощность локомотива
 
     def __eq__(self, other):
         # Два локомотива равны по серийному номеру
+        if not isinstance(other, Locomotive):
+            return NotImplemented
         return self.serial_number == other.serial_number
 
+    def __hash__(self):
+        return hash(self.serial_number)
+
     def to_dict(self):
-        return self.__dict__
+        return {'serial_number': self.serial_number, 'power': self.power}
 
     @classmethod
     def from_dict(cls, data):
-        return cls(**data)
+        return cls(data['serial_number'], data['power'])
 
 # Основной класс Train представляет весь железнодорожный состав
 class Train:
+    __slots__ = ('number', 'route', 'locomotive', 'carriages', '_carriage_keys')
+
     def __init__(self, number, route):
         self.number = number      # Номер поезда
         self.route = route        # Маршрут следования
         self.locomotive = None    # Локомотив поезда
         self.carriages = []       # Список вагонов в составе
+        self._carriage_keys = set()  # Ключи (номер, тип) вагонов для быстрой проверки
 
     def set_locomotive(self, locomotive):
         # Устанавливает локомотив для поезда
@@ -86,84 +188,191 @@ class Train:
 
     def add_carriage(self, carriage):
         # Добавляет вагон в состав, если его еще нет
-        if carriage not in self.carriages:
+        key = (carriage.number, carriage.carriage_type)
+        if key not in self._carriage_keys:
+            self._carriage_keys.add(key)
             self.carriages.append(carriage)
 
     def remove_carriage(self, carriage):
         # Удаляет вагон из состава
-        if carriage in self.carriages:
+        key = (carriage.number, carriage.carriage_type)
+        if key in self._carriage_keys:
+            self._carriage_keys.remove(key)
             self.carriages.remove(carriage)
 
+    def booked_count(self):
+        # Количество забронированных мест во всем составе
+        return sum(carriage.booked_count() for carriage in self.carriages)
+
     def __eq__(self, other):
         # Два поезда равны по номеру
+        if not isinstance(other, Train):
+            return NotImplemented
         return self.number == other.number
 
-    def save_to_file(self, filename="train_data.txt"):
-        # Сохраняет весь состав поезда в JSON файл
-        data = {
+    def __hash__(self):
+        return hash(self.number)
+
+    def _to_plain_dict(self):
+        # Преобразует весь состав в словарь из простых типов для сохранения
+        return {
             'number': self.number,
             'route': self.route,
             'locomotive': self.locomotive.to_dict() if self.locomotive else None,
             'carriages': [carriage.to_dict() for carriage in self.carriages]
         }
-        # Записываем данные в файл с русской кодировкой
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
 
     @classmethod
-    def load_from_file(cls, filename="train_data.txt"):
-        # Загружает состав поезда из JSON файла
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Создаем объект поезда
-        train = cls(data['number'], data['route'])
-        # Восстанавливаем локомотив если он был
-        if data['locomotive']:
-            train.set_locomotive(Locomotive.from_dict(data['locomotive']))
-        # Восстанавливаем все вагоны
-        train.carriages = [Carriage.from_dict(carriage_data) for carriage_data in data['carriages']]
+    def _assemble(cls, number, route, locomotive, carriages):
+        # Собирает поезд из загруженных частей. Вагоны добавляются через add_carriage,
+        # поэтому повторы отбрасываются и список вагонов совпадает с набором ключей
+        train = cls(number, route)
+        if locomotive:
+            train.set_locomotive(locomotive)
+        for carriage in carriages:
+            train.add_carriage(carriage)
         return train
 
+    @classmethod
+    def _from_plain_dict(cls, data):
+        # Восстанавливаем локомотив если он был и все вагоны
+        locomotive = Locomotive.from_dict(data['locomotive']) if data['locomotive'] else None
+        carriages = (Carriage.from_dict(carriage_data) for carriage_data in data['carriages'])
+        return cls._assemble(data['number'], data['route'], locomotive, carriages)
+
+    def save_to_file(self, filename="train_data.txt", pretty=False):
+        # Сохраняет весь состав поезда в JSON файл.
+        # По умолчанию пишет компактно; pretty=True включает отступы для чтения человеком
+        data = self._to_plain_dict()
+        # Записываем данные в файл с русской кодировкой
+        if orjson is not None:
+            # orjson всегда пишет UTF-8, поэтому русский текст сохраняется как есть
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(data, option=option))
+        else:
+            kwargs = {'ensure_ascii': False}
+            if pretty:
+                kwargs['indent'] = 2
+            else:
+                kwargs['separators'] = (',', ':')
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, **kwargs)
+
+    @classmethod
+    def load_from_file(cls, filename="train_data.txt", stream=False):
+        # Загружает состав поезда из JSON файла.
+        # stream=True разбирает файл потоково через ijson: медленнее, но экономит память
+        # на очень больших файлах
+        if stream:
+            if ijson is None:
+                raise ImportError("Для потоковой загрузки нужен пакет ijson")
+            return cls._load_streaming(filename)
+        if orjson is not None:
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        return cls._from_plain_dict(data)
+
+    def save_to_msgpack(self, filename="train_data.mp"):
+        # Сохраняет состав в компактный двоичный формат MessagePack (нужен пакет msgpack)
+        if msgpack is None:
+            raise ImportError("Для сохранения в MessagePack нужен пакет msgpack")
+        with open(filename, 'wb') as f:
+            f.write(msgpack.packb(self._to_plain_dict(), use_bin_type=True))
+
+    @classmethod
+    def load_from_msgpack(cls, filename="train_data.mp"):
+        # Загружает состав поезда из файла MessagePack
+        if msgpack is None:
+            raise ImportError("Для загрузки из MessagePack нужен пакет msgpack")
+        with open(filename, 'rb') as f:
+            data = msgpack.unpackb(f.read(), raw=False)
+        return cls._from_plain_dict(data)
+
+    @classmethod
+    def _load_streaming(cls, filename):
+        # Разбирает JSON по событиям: места и вагоны создаются по мере чтения,
+        # а промежуточный словарь со всем составом в памяти не строится
+        number = route = locomotive = carriage = None
+        locomotive_data = {}
+        seat_data = {}
+        carriages = []
+        with open(filename, 'rb') as f:
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                parent, _, key = prefix.rpartition('.')
+                if prefix == 'carriages.item.seats.item':
+                    if event == 'end_map':
+                        # Место записываем сразу в колонки вагона, без объекта Seat
+                        carriage.add_seat_values(seat_data['number'], seat_data['seat_type'],
+                                                 seat_data['comfort_class'],
+                                                 seat_data.get('reserved', False))
+                        seat_data = {}
+                elif parent == 'carriages.item.seats.item':
+                    # Берем только поля самого места, вложенные объекты не разворачиваем
+                    seat_data[key] = value
+                elif prefix == 'carriages.item':
+                    if event == 'start_map':
+                        carriage = Carriage(None, None)
+                    elif event == 'end_map':
+                        carriages.append(carriage)
+                elif prefix == 'carriages.item.number':
+                    carriage.number = value
+                elif prefix == 'carriages.item.carriage_type':
+                    carriage.carriage_type = value
+                elif parent == 'locomotive':
+                    locomotive_data[key] = value
+                elif prefix == 'locomotive' and event == 'end_map':
+                    locomotive = Locomotive.from_dict(locomotive_data)
+                elif prefix == 'number':
+                    number = value
+                elif prefix == 'route':
+                    route = value
+
+        return cls._assemble(number, route, locomotive, carriages)
+
     def create_excel_report(self, filename="train_report.xlsx"):
-        # Создает детальный отчет в Excel о всех местах в поезде
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"Train {self.number}"  # Название листа
+        # Создает детальный отчет в Excel о всех местах в поезде.
+        # Режим write_only пишет строки потоком, не храня объект Cell на каждую ячейку
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=f"Train {self.number}")  # Название листа
 
         # Создаем заголовки таблицы
-        headers = ['Вагон', 'Тип вагона', 'Место', 'Тип места', 'Класс', 'Статус']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)  # Жирный шрифт для заголовков
-
-        # Заполняем таблицу данными о местах
-        row = 2
-        for carriage in self.carriages:
-            for seat in carriage.seats:
-                # Записываем информацию о каждом месте
-                ws.cell(row=row, column=1, value=carriage.number)
-                ws.cell(row=row, column=2, value=carriage.carriage_type)
-                ws.cell(row=row, column=3, value=seat.number)
-                ws.cell(row=row, column=4, value=seat.seat_type)
-                ws.cell(row=row, column=5, value=seat.comfort_class)
-                ws.cell(row=row, column=6, value="Забронировано" if seat.reserved else "Свободно")
-                row += 1
-
-        # Автоматически настраиваем ширину колонок по содержимому
-        for column in ws.columns:
-            max_length = 0
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws.column_dimensions[column[0].column_letter].width = max_length + 2
+        header_cells = []
+        for header in _HEADERS:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = _BOLD  # Жирный шрифт для заголовков
+            header_cells.append(cell)
+
+        # Считаем ширину колонок по содержимому. В режиме write_only ее нужно
+        # задать до записи первой строки, поэтому ширина считается по колонкам мест
+        widths = [len(header) for header in _HEADERS]
+        update_widths(self.carriages, widths, _STATUS)
+        for letter, width in zip(_COL_LETTERS, widths):
+            ws.column_dimensions[letter].width = width + 2
+
+        # Строки о местах пишутся потоком прямо из генератора
+        ws.append(header_cells)
+        for values in emit_rows(self.carriages, _STATUS):
+            ws.append(values)
 
         wb.save(filename)
         print(f"Отчет сохранен: {filename}")
 
+    @classmethod
+    def create_reports_bulk(cls, trains, out_dir, workers=None):
+        # Создает Excel отчеты для нескольких поездов параллельно в отдельных процессах
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(train.create_excel_report,
+                                       os.path.join(out_dir, f"{train.number}.xlsx"))
+                       for train in trains]
+            for future in as_completed(futures):
+                future.result()  # Пробрасываем ошибки из процессов
+
 # Демонстрация работы программы
 if __name__ == "__main__":
     # Создаем тестовые данные
@@ -195,7 +404,7 @@ if __name__ == "__main__":
     print("Сравнение мест (разный класс):", seat1 == seat3)
 
     # Сохраняем данные в файл и загружаем обратно
-    train.save_to_file()
+    train.save_to_file(pretty=True)
     loaded_train = Train.load_from_file()
 
     # Генерируем Excel отчет о поезде